@@ -20,6 +20,9 @@ module "database" {
   db_sku_name          = var.db_sku_name
   db_storage_mb        = var.db_storage_mb
 
+  db_pgbouncer_enabled   = var.db_pgbouncer_enabled
+  db_pgbouncer_pool_size = var.db_pgbouncer_pool_size
+
   allowed_ips = var.allowed_ips
   tags        = var.tags
 }
@@ -78,6 +81,9 @@ module "functions" {
   function_app_name = var.function_app_name
   sku_name          = var.function_app_sku
 
+  maximum_instance_count = var.function_app_max_instances
+  http_concurrency       = var.function_app_http_concurrency
+
   # API Configuration
   api_base_url       = var.api_base_url_override != "" ? var.api_base_url_override : module.containers.api_url
   client_passphrases = var.client_passphrases
@@ -264,13 +270,14 @@ module "containers" {
   managed_identity_id            = module.identity.managed_identity_id
   managed_identity_principal_id  = module.identity.managed_identity_principal_id
   managed_identity_client_id     = module.identity.managed_identity_client_id
-  database_url                   = "postgresql://${var.db_username}:${urlencode(var.db_password)}@${module.database.postgres_fqdn}:5432/${var.db_name}?sslmode=require"
+  database_url                   = "postgresql://${var.db_username}:${urlencode(var.db_password)}@${module.database.postgres_fqdn}:${module.database.postgres_port}/${var.db_name}?sslmode=require"
   web_pubsub_hostname            = module.messaging.web_pubsub_hostname
   app_insights_connection_string = module.monitoring.app_insights_connection_string
   log_analytics_workspace_id     = module.monitoring.log_analytics_id
 
   # Database parameters (required by current module interface)
   database_host     = module.database.postgres_fqdn
+  database_port     = module.database.postgres_port
   database_name     = var.db_name
   database_username = var.db_username
   database_password = var.db_password
@@ -478,7 +478,7 @@ resource "azurerm_container_app" "api_functions" {
   # Database connection as secure secret
   secret {
     name  = "db-url"
-    value = "postgresql://${var.database_username}:${urlencode(var.database_password)}@${var.database_host}:5432/${var.database_name}?sslmode=require"
+    value = "postgresql://${var.database_username}:${urlencode(var.database_password)}@${var.database_host}:${var.database_port}/${var.database_name}?sslmode=require"
   }
 
   template {
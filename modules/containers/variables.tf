@@ -148,6 +148,12 @@ variable "database_host" {
   description = "Database hostname"
 }
 
+variable "database_port" {
+  type        = number
+  description = "Database port (6432 when connecting through PgBouncer)"
+  default     = 5432
+}
+
 variable "database_name" {
   type        = string
   description = "Database name"
@@ -25,9 +25,64 @@ resource "azurerm_postgresql_flexible_server" "pg" {
   lifecycle {
     prevent_destroy = true
     ignore_changes = [zone]
+
+    precondition {
+      condition     = !var.db_pgbouncer_enabled || !startswith(var.db_sku_name, "B_")
+      error_message = "db_pgbouncer_enabled requires a General Purpose or Memory Optimized SKU; built-in PgBouncer is not available on Burstable (B_*) SKUs."
+    }
   }
 }
 
+# Built-in PgBouncer (transaction pooling) so short-lived Functions/API
+# connections multiplex onto a small set of backend connections instead of
+# each worker holding its own. Not available on Burstable (B_*) SKUs.
+resource "azurerm_postgresql_flexible_server_configuration" "pgbouncer_enabled" {
+  count     = var.db_pgbouncer_enabled ? 1 : 0
+  name      = "pgbouncer.enabled"
+  server_id = azurerm_postgresql_flexible_server.pg.id
+  value     = "true"
+}
+
+resource "azurerm_postgresql_flexible_server_configuration" "pgbouncer_pool_mode" {
+  count     = var.db_pgbouncer_enabled ? 1 : 0
+  name      = "pgbouncer.pool_mode"
+  server_id = azurerm_postgresql_flexible_server.pg.id
+  value     = "TRANSACTION"
+
+  depends_on = [azurerm_postgresql_flexible_server_configuration.pgbouncer_enabled]
+}
+
+resource "azurerm_postgresql_flexible_server_configuration" "pgbouncer_default_pool_size" {
+  count     = var.db_pgbouncer_enabled ? 1 : 0
+  name      = "pgbouncer.default_pool_size"
+  server_id = azurerm_postgresql_flexible_server.pg.id
+  value     = tostring(var.db_pgbouncer_pool_size)
+
+  depends_on = [azurerm_postgresql_flexible_server_configuration.pgbouncer_pool_mode]
+}
+
+resource "azurerm_postgresql_flexible_server_configuration" "pgbouncer_max_client_conn" {
+  count     = var.db_pgbouncer_enabled ? 1 : 0
+  name      = "pgbouncer.max_client_conn"
+  server_id = azurerm_postgresql_flexible_server.pg.id
+  value     = "2000"
+
+  depends_on = [azurerm_postgresql_flexible_server_configuration.pgbouncer_default_pool_size]
+}
+
+# Transaction pooling hands each transaction whichever server connection is
+# free, so driver-side named prepared statements (asyncpg, psycopg 3) would
+# otherwise hit "prepared statement does not exist". A non-zero value lets
+# PgBouncer track protocol-level prepares across server connections.
+resource "azurerm_postgresql_flexible_server_configuration" "pgbouncer_max_prepared_statements" {
+  count     = var.db_pgbouncer_enabled ? 1 : 0
+  name      = "pgbouncer.max_prepared_statements"
+  server_id = azurerm_postgresql_flexible_server.pg.id
+  value     = "200"
+
+  depends_on = [azurerm_postgresql_flexible_server_configuration.pgbouncer_max_client_conn]
+}
+
 # Random suffix to ensure unique database server name
 resource "random_id" "db_suffix" {
   byte_length = 4
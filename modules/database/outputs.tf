@@ -8,13 +8,18 @@ output "postgres_name" {
   description = "Name of the PostgreSQL server"
 }
 
+output "postgres_port" {
+  value       = var.db_pgbouncer_enabled ? 6432 : 5432
+  description = "Port application connections should use (6432 when PgBouncer is enabled)"
+}
+
 output "database_name" {
   value       = azurerm_postgresql_flexible_server_database.db.name
   description = "Name of the database"
 }
 
 output "connection_string" {
-  value       = "postgresql://${var.db_username}:${var.db_password}@${azurerm_postgresql_flexible_server.pg.fqdn}:5432/${var.db_name}?sslmode=require"
+  value       = "postgresql://${var.db_username}:${var.db_password}@${azurerm_postgresql_flexible_server.pg.fqdn}:${var.db_pgbouncer_enabled ? 6432 : 5432}/${var.db_name}?sslmode=require"
   description = "PostgreSQL connection string"
   sensitive   = true
 }
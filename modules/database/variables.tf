@@ -38,6 +38,18 @@ variable "db_storage_mb" {
   default     = 32768
 }
 
+variable "db_pgbouncer_enabled" {
+  type        = bool
+  description = "Route application connections through the built-in PgBouncer (port 6432, TRANSACTION pooling). Requires a General Purpose or Memory Optimized SKU. Session state (SET, advisory locks, SQL-level PREPARE) does not survive between transactions; protocol-level prepared statements are supported via pgbouncer.max_prepared_statements"
+  default     = false
+}
+
+variable "db_pgbouncer_pool_size" {
+  type        = number
+  description = "PgBouncer backend connections per user/database pair (roughly 2x server vCores)"
+  default     = 4
+}
+
 variable "postgres_server_name" {
   type        = string
   description = "Name of the PostgreSQL server (if empty, will generate unique name)"
@@ -59,7 +59,8 @@ resource "azurerm_function_app_flex_consumption" "main" {
   runtime_version = "3.11"
 
   instance_memory_in_mb  = 512
-  maximum_instance_count = 40
+  maximum_instance_count = var.maximum_instance_count
+  http_concurrency       = var.http_concurrency
 
   site_config {
     application_insights_connection_string = var.app_insights_connection_string
@@ -25,6 +25,18 @@ variable "sku_name" {
   }
 }
 
+variable "maximum_instance_count" {
+  description = "Maximum number of Flex Consumption instances the app can scale out to"
+  type        = number
+  default     = 40
+}
+
+variable "http_concurrency" {
+  description = "Concurrent HTTP invocations per instance (null = platform default). Lower it for memory-heavy handlers so load spreads across instances instead of exhausting one"
+  type        = number
+  default     = null
+}
+
 variable "api_base_url" {
   description = "Base URL for ReportMate API (for storage alerts function)"
   type        = string
@@ -7,7 +7,7 @@ Runs daily via Azure Container Apps Job to prevent database crisis recurrence.
 import os
 import sys
 import psycopg2
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 from typing import Tuple
 
 # Configuration
@@ -17,6 +17,49 @@ DB_NAME = os.getenv('DB_NAME', 'reportmate')
 DB_USER = os.getenv('DB_USER', 'reportmate')
 DB_PASS = os.getenv('DB_PASS')
 
+# Module tables maintained by this job (one row per device expected in each)
+MODULE_TABLES = (
+    'applications', 'hardware', 'installs', 'network',
+    'security', 'inventory', 'management', 'system',
+    'displays', 'printers'
+)
+
+# Per-table statements, built once at import. Table names come from the
+# fixed MODULE_TABLES tuple above, never from input.
+DUPLICATE_DELETE_SQL = {
+    table: f"""
+        WITH duplicates AS (
+            SELECT id, 
+                   ROW_NUMBER() OVER (
+                       PARTITION BY device_id 
+                       ORDER BY updated_at DESC, id DESC
+                   ) as rn
+            FROM {table}
+        )
+        DELETE FROM {table}
+        WHERE id IN (
+            SELECT id FROM duplicates WHERE rn > 1
+        )
+    """
+    for table in MODULE_TABLES
+}
+
+# Orphan deletes for all tables run as data-modifying CTEs of one statement
+# (see remove_orphaned_module_records). NOT EXISTS plans as an anti-join;
+# the IS NOT NULL guard keeps NULL device_id rows, as the old NOT IN did.
+ORPHAN_DELETE_CTE = {
+    table: f"""
+        orphans_{table} AS (
+            DELETE FROM {table} m
+            WHERE m.device_id IS NOT NULL
+              AND NOT EXISTS (
+                SELECT 1 FROM devices d WHERE d.serial_number = m.device_id
+            )
+            RETURNING 1
+        )"""
+    for table in MODULE_TABLES
+}
+
 def get_connection():
     """Connect to PostgreSQL database"""
     if not DB_PASS:
@@ -30,50 +73,50 @@ def get_connection():
         sslmode='require'
     )
 
+def get_module_tables(cursor) -> list:
+    """
+    Return the module tables that exist in this database.
+    Checked once up front so a table that hasn't been migrated yet is skipped
+    instead of aborting the whole maintenance transaction.
+    """
+    cursor.execute("""
+        SELECT t
+        FROM unnest(%s::text[]) WITH ORDINALITY AS m(t, ord)
+        WHERE to_regclass(t) IS NOT NULL
+        ORDER BY ord
+    """, (list(MODULE_TABLES),))
+
+    tables = [row[0] for row in cursor.fetchall()]
+    missing = [t for t in MODULE_TABLES if t not in tables]
+    if missing:
+        print(f"  Skipping missing module tables: {', '.join(missing)}")
+    return tables
+
 def cleanup_old_events(cursor, retention_days: int) -> int:
     """Delete events older than retention period"""
-    cutoff = datetime.now() - timedelta(days=retention_days)
-    
-    print(f"  Cleaning events older than {cutoff.strftime('%Y-%m-%d')}...")
+    print(f"  Cleaning events older than {retention_days} days...")
+
+    # Cutoff computed server-side so it follows the database clock (UTC)
     cursor.execute("""
-        DELETE FROM events 
-        WHERE created_at < %s
-    """, (cutoff,))
+        DELETE FROM events
+        WHERE created_at < NOW() - make_interval(days => %s)
+    """, (retention_days,))
     
     deleted = cursor.rowcount
     print(f"  Deleted {deleted:,} old events")
     return deleted
 
-def remove_duplicate_module_records(cursor) -> int:
+def remove_duplicate_module_records(cursor, module_tables) -> int:
     """
     Keep only the newest record per device per module table.
     Each device should have exactly 1 record in each module table.
     """
     print(f"  Removing duplicate module records...")
     
-    module_tables = [
-        'applications', 'hardware', 'installs', 'network', 
-        'security', 'inventory', 'management', 'system', 
-        'displays', 'printers'
-    ]
-    
     total_deleted = 0
     
     for table in module_tables:
-        cursor.execute(f"""
-            WITH duplicates AS (
-                SELECT id, 
-                       ROW_NUMBER() OVER (
-                           PARTITION BY device_id 
-                           ORDER BY updated_at DESC, id DESC
-                       ) as rn
-                FROM {table}
-            )
-            DELETE FROM {table}
-            WHERE id IN (
-                SELECT id FROM duplicates WHERE rn > 1
-            )
-        """)
+        cursor.execute(DUPLICATE_DELETE_SQL[table])
         
         deleted = cursor.rowcount
         if deleted > 0:
@@ -83,27 +126,26 @@ def remove_duplicate_module_records(cursor) -> int:
     print(f"  Total duplicates removed: {total_deleted}")
     return total_deleted
 
-def remove_orphaned_module_records(cursor) -> int:
+def remove_orphaned_module_records(cursor, module_tables) -> int:
     """Delete module records for devices that no longer exist"""
     print(f"  Removing orphaned module records...")
     
-    module_tables = [
-        'applications', 'hardware', 'installs', 'network', 
-        'security', 'inventory', 'management', 'system',
-        'displays', 'printers'
-    ]
+    if not module_tables:
+        print(f"  Total orphans removed: 0")
+        return 0
+    
+    # One round-trip for every table; the final SELECT returns the per-table
+    # deleted counts in module_tables order
+    cursor.execute(
+        "WITH" + ",".join(ORPHAN_DELETE_CTE[table] for table in module_tables)
+        + "\nSELECT " + ", ".join(
+            f"(SELECT COUNT(*) FROM orphans_{table})" for table in module_tables
+        )
+    )
     
     total_deleted = 0
     
-    for table in module_tables:
-        cursor.execute(f"""
-            DELETE FROM {table}
-            WHERE device_id NOT IN (
-                SELECT serial_number FROM devices
-            )
-        """)
-        
-        deleted = cursor.rowcount
+    for table, deleted in zip(module_tables, cursor.fetchone()):
         if deleted > 0:
             print(f"    {table}: removed {deleted} orphans")
             total_deleted += deleted
@@ -142,21 +184,28 @@ def cleanup_orphaned_policies(cursor) -> int:
     
     deleted = cursor.rowcount
     
-    # Update device counts for remaining policies
+    # Update device counts for remaining policies. Only rows whose count
+    # actually changed are rewritten, so a quiet night doesn't churn every
+    # catalog tuple (WAL + VACUUM work for no change).
     cursor.execute("""
         UPDATE policy_catalog pc
-        SET device_count = (
-            SELECT COUNT(DISTINCT p.device_id)
-            FROM profiles p
-            WHERE pc.policy_hash = ANY(
-                COALESCE(p.intune_policy_hashes, '{}') || 
-                COALESCE(p.security_policy_hashes, '{}') || 
-                COALESCE(p.mdm_policy_hashes, '{}')
-            )
-        )
+        SET device_count = counts.device_count
+        FROM (
+            SELECT h.policy_hash, COUNT(DISTINCT p.device_id) AS device_count
+            FROM profiles p,
+                 unnest(
+                     COALESCE(p.intune_policy_hashes, '{}') ||
+                     COALESCE(p.security_policy_hashes, '{}') ||
+                     COALESCE(p.mdm_policy_hashes, '{}')
+                 ) AS h(policy_hash)
+            GROUP BY h.policy_hash
+        ) counts
+        WHERE pc.policy_hash = counts.policy_hash
+          AND pc.device_count IS DISTINCT FROM counts.device_count
     """)
-    
-    print(f"  Removed {deleted} orphaned policies, updated device counts")
+
+    updated = cursor.rowcount
+    print(f"  Removed {deleted} orphaned policies, updated {updated} device counts")
     return deleted
 
 def optimize_database(cursor) -> None:
@@ -198,7 +247,7 @@ def main():
     """Main maintenance routine"""
     print(f"\n{'='*60}")
     print(f"ReportMate Database Maintenance")
-    print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
+    print(f"Started: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}")
     print(f"{'='*60}\n")
     
     try:
@@ -221,10 +270,12 @@ def main():
         events_deleted = cleanup_old_events(cursor, EVENT_RETENTION_DAYS)
         print()
         
-        duplicates_deleted = remove_duplicate_module_records(cursor)
+        module_tables = get_module_tables(cursor)
+
+        duplicates_deleted = remove_duplicate_module_records(cursor, module_tables)
         print()
         
-        orphans_deleted = remove_orphaned_module_records(cursor)
+        orphans_deleted = remove_orphaned_module_records(cursor, module_tables)
         print()
         
         policies_deleted = cleanup_orphaned_policies(cursor)
@@ -255,7 +306,7 @@ def main():
         print(f"  Duplicates removed: {duplicates_deleted:,}")
         print(f"  Orphans removed: {orphans_deleted:,}")
         print(f"  Policies cleaned: {policies_deleted:,}")
-        print(f"Completed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
+        print(f"Completed: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}")
         print(f"{'='*60}\n")
         
         cursor.close()
@@ -0,0 +1,130 @@
+-- Migration 012: server-side device bundle for single-device lookups
+--
+-- get_device_bundle(serial) returns the device row plus the data of every
+-- module table as ONE JSONB document, so a device lookup is a single
+-- round-trip instead of a devices SELECT followed by one query per module
+-- and a Python-side dict merge + re-serialization of every module payload.
+--
+--   SELECT get_device_bundle('ABC123');          -- NULL when not found
+--   SELECT get_device_bundle('ABC123')::text;    -- splice straight into a response
+--   SELECT get_device_bundle('ABC123', ARRAY['hardware','system']);  -- subset
+--
+-- Lookup tries the primary key first and only falls back to serial_number
+-- when no id matches (UNION ALL + LIMIT 1 stops after the first hit), which
+-- keeps each side on its own index instead of a bitmap OR. Databases built
+-- by the numbered migrations (001) have no index on serial_number, so one
+-- is created below; modular-database-schema.sql already has a UNIQUE one.
+--
+-- Module tables are UNIQUE(device_id), so each LEFT JOIN yields at most one
+-- row. Modules with no data are omitted from the "modules" object; the
+-- module payloads themselves are returned exactly as stored.
+--
+-- "clientVersion" is resolved here (devices.client_version, else the first
+-- of the inventory/system/hardware/management payloads that carries one)
+-- so callers don't walk every module blob to pull out one scalar. It is
+-- resolved independently of p_modules. "latestCollection" is the newest
+-- collected_at across the returned modules only (GREATEST ignores NULLs).
+--
+-- p_modules restricts the bundle to the named modules (NULL = all). The
+-- filter sits in each join condition, so unrequested module tables are
+-- never read. Status/name-only callers pay for the devices row alone, plus
+-- the clientVersion fallback lookups when devices.client_version is NULL.
+--
+-- Prerequisite: every module table it joins must exist, including identity
+-- (created by migrations/add_identity_table.sql, run before this file by
+-- run-migrations.ps1). A LANGUAGE sql body is validated at CREATE time, so
+-- a missing table makes the CREATE FUNCTION fail.
+--
+-- Idempotent: the earlier single-argument version is dropped so calls with
+-- one argument stay unambiguous, then CREATE OR REPLACE.
+
+CREATE INDEX IF NOT EXISTS idx_devices_serial_number ON devices(serial_number);
+
+DROP FUNCTION IF EXISTS get_device_bundle(TEXT);
+
+CREATE OR REPLACE FUNCTION get_device_bundle(p_serial TEXT, p_modules TEXT[] DEFAULT NULL)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    WITH dev AS (
+        (SELECT * FROM devices WHERE id = p_serial)
+        UNION ALL
+        (SELECT * FROM devices WHERE serial_number = p_serial)
+        LIMIT 1
+    )
+    SELECT jsonb_build_object(
+        'device', to_jsonb(dev),
+        -- Scalar subqueries, not the joined rows, so p_modules can't hide a
+        -- stored version; COALESCE only evaluates them while still NULL.
+        'clientVersion', COALESCE(
+            dev.client_version,
+            (SELECT data->>'clientVersion' FROM inventory  WHERE device_id = dev.id),
+            (SELECT data->>'clientVersion' FROM system     WHERE device_id = dev.id),
+            (SELECT data->>'clientVersion' FROM hardware   WHERE device_id = dev.id),
+            (SELECT data->>'clientVersion' FROM management WHERE device_id = dev.id)
+        ),
+        'latestCollection', GREATEST(
+            applications.collected_at,
+            displays.collected_at,
+            hardware.collected_at,
+            identity.collected_at,
+            installs.collected_at,
+            inventory.collected_at,
+            management.collected_at,
+            network.collected_at,
+            printers.collected_at,
+            profiles.collected_at,
+            security.collected_at,
+            system.collected_at
+        ),
+        -- Not jsonb_strip_nulls(): it strips nulls at every depth and would
+        -- rewrite the module payloads themselves. Only absent modules (NULL
+        -- data) are dropped here; payloads pass through untouched.
+        'modules', COALESCE((
+            SELECT jsonb_object_agg(k, v)
+            FROM (VALUES
+                ('applications', applications.data),
+                ('displays',     displays.data),
+                ('hardware',     hardware.data),
+                ('identity',     identity.data),
+                ('installs',     installs.data),
+                ('inventory',    inventory.data),
+                ('management',   management.data),
+                ('network',      network.data),
+                ('printers',     printers.data),
+                ('profiles',     profiles.data),
+                ('security',     security.data),
+                ('system',       system.data)
+            ) AS mods(k, v)
+            WHERE v IS NOT NULL
+        ), '{}'::jsonb)
+    )
+    FROM dev
+    LEFT JOIN applications ON applications.device_id = dev.id
+                          AND (p_modules IS NULL OR 'applications' = ANY(p_modules))
+    LEFT JOIN displays     ON displays.device_id     = dev.id
+                          AND (p_modules IS NULL OR 'displays' = ANY(p_modules))
+    LEFT JOIN hardware     ON hardware.device_id     = dev.id
+                          AND (p_modules IS NULL OR 'hardware' = ANY(p_modules))
+    LEFT JOIN identity     ON identity.device_id     = dev.id
+                          AND (p_modules IS NULL OR 'identity' = ANY(p_modules))
+    LEFT JOIN installs     ON installs.device_id     = dev.id
+                          AND (p_modules IS NULL OR 'installs' = ANY(p_modules))
+    LEFT JOIN inventory    ON inventory.device_id    = dev.id
+                          AND (p_modules IS NULL OR 'inventory' = ANY(p_modules))
+    LEFT JOIN management   ON management.device_id   = dev.id
+                          AND (p_modules IS NULL OR 'management' = ANY(p_modules))
+    LEFT JOIN network      ON network.device_id      = dev.id
+                          AND (p_modules IS NULL OR 'network' = ANY(p_modules))
+    LEFT JOIN printers     ON printers.device_id     = dev.id
+                          AND (p_modules IS NULL OR 'printers' = ANY(p_modules))
+    LEFT JOIN profiles     ON profiles.device_id     = dev.id
+                          AND (p_modules IS NULL OR 'profiles' = ANY(p_modules))
+    LEFT JOIN security     ON security.device_id     = dev.id
+                          AND (p_modules IS NULL OR 'security' = ANY(p_modules))
+    LEFT JOIN system       ON system.device_id       = dev.id
+                          AND (p_modules IS NULL OR 'system' = ANY(p_modules));
+$$;
+
+COMMENT ON FUNCTION get_device_bundle(TEXT, TEXT[]) IS 'Device row + all module data as one JSONB document (single round-trip device lookup).';
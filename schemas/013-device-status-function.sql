@@ -0,0 +1,34 @@
+-- Migration 013: connection status classification in SQL
+--
+-- device_connection_status(last_seen) maps a last-contact time onto the
+-- devices.status vocabulary, so list queries can select the status string
+-- directly instead of shipping last_seen to the caller and branching on
+-- "hours ago" per row:
+--
+--   SELECT id, name, device_connection_status(last_seen) AS status FROM devices;
+--
+--   NULL            -> 'missing'
+--   older than 24h  -> 'offline'
+--   older than 1h   -> 'warning'
+--   otherwise       -> 'active'
+--
+-- A single-expression LANGUAGE sql function is inlined by the planner, so
+-- this costs the same as writing the CASE into each query. STABLE (not
+-- IMMUTABLE) because it reads NOW().
+--
+-- Idempotent: CREATE OR REPLACE.
+
+CREATE OR REPLACE FUNCTION device_connection_status(p_last_seen TIMESTAMPTZ)
+RETURNS TEXT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT CASE
+        WHEN p_last_seen IS NULL                        THEN 'missing'
+        WHEN p_last_seen < NOW() - INTERVAL '24 hours'  THEN 'offline'
+        WHEN p_last_seen < NOW() - INTERVAL '1 hour'    THEN 'warning'
+        ELSE 'active'
+    END;
+$$;
+
+COMMENT ON FUNCTION device_connection_status(TIMESTAMPTZ) IS 'Classify last_seen as active/warning/offline/missing (1h / 24h thresholds).';
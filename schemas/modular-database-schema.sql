@@ -271,6 +271,9 @@ CREATE INDEX IF NOT EXISTS idx_devices_mac_address_primary ON devices(mac_addres
 CREATE INDEX IF NOT EXISTS idx_events_device_id ON events(device_id);
 CREATE INDEX IF NOT EXISTS idx_events_event_type ON events(event_type);
 CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events(timestamp);
+-- Per-device event history: newest-first pages (incl. keyset "timestamp < $cursor") without a sort
+CREATE INDEX IF NOT EXISTS idx_events_device_timestamp ON events(device_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_events_device_type_timestamp ON events(device_id, event_type, timestamp DESC);
 CREATE UNIQUE INDEX IF NOT EXISTS idx_events_device_module_upsert
     ON events(device_id, module_id) WHERE module_id IS NOT NULL;
 
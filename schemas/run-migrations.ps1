@@ -37,7 +37,10 @@ $migrationFiles = @(
     "002-modules-migration.sql",
     "003-indexes-migration.sql",
     "004-usage-history-migration.sql",
-    "011-app-settings.sql"
+    "011-app-settings.sql",
+    "migrations/add_identity_table.sql",
+    "012-device-bundle-function.sql",
+    "013-device-status-function.sql"
 )
 
 foreach ($migration in $migrationFiles) {
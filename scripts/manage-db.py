@@ -27,6 +27,14 @@ CYAN = '\033[96m'
 RESET = '\033[0m'
 BOLD = '\033[1m'
 
+# Connection settings (resolved once at startup)
+DB_SERVER = os.getenv('DB_SERVER', 'reportmate-database.postgres.database.azure.com')
+DB_NAME = os.getenv('DB_NAME', 'reportmate')
+DB_USER = os.getenv('DB_USER', 'reportmate')
+
+# db_password = "..." in terraform.tfvars
+DB_PASSWORD_PATTERN = re.compile(r'db_password\s*=\s*"([^"]+)"')
+
 def print_header(text):
     """Print formatted header"""
     print(f"\n{CYAN}{'=' * 70}{RESET}")
@@ -70,7 +78,7 @@ def get_db_password_from_tfvars():
                     content = f.read()
                     
                 # Parse db_password using regex (handles quoted and unquoted values)
-                match = re.search(r'db_password\s*=\s*"([^"]+)"', content)
+                match = DB_PASSWORD_PATTERN.search(content)
                 if match:
                     print_success("Loaded database password from terraform.tfvars")
                     return match.group(1)
@@ -81,6 +89,16 @@ def get_db_password_from_tfvars():
     
     return None
 
+def _credentials(password, source):
+    """Build the credentials dict for the configured server/database/user"""
+    return {
+        'host': DB_SERVER,
+        'database': DB_NAME,
+        'user': DB_USER,
+        'password': password,
+        'source': source
+    }
+
 def get_db_credentials(args):
     """
     Get database credentials with secure fallback chain:
@@ -91,36 +109,18 @@ def get_db_credentials(args):
     # Priority 1: terraform.tfvars (secure, infrastructure-integrated)
     password = get_db_password_from_tfvars()
     if password:
-        return {
-            'host': os.getenv('DB_SERVER', 'reportmate-database.postgres.database.azure.com'),
-            'database': os.getenv('DB_NAME', 'reportmate'),
-            'user': os.getenv('DB_USER', 'reportmate'),
-            'password': password,
-            'source': 'terraform.tfvars'
-        }
+        return _credentials(password, 'terraform.tfvars')
     
     # Priority 2: Environment variable (secure, temporary)
     password = os.getenv('DB_PASSWORD')
     if password:
         print_info("Using DB_PASSWORD from environment variable")
-        return {
-            'host': os.getenv('DB_SERVER', 'reportmate-database.postgres.database.azure.com'),
-            'database': os.getenv('DB_NAME', 'reportmate'),
-            'user': os.getenv('DB_USER', 'reportmate'),
-            'password': password,
-            'source': 'environment'
-        }
+        return _credentials(password, 'environment')
     
     # Priority 3: Command-line flag (least secure, emergency only)
     if args.password:
         print_warning("Using password from command-line flag (visible in process list!)")
-        return {
-            'host': os.getenv('DB_SERVER', 'reportmate-database.postgres.database.azure.com'),
-            'database': os.getenv('DB_NAME', 'reportmate'),
-            'user': os.getenv('DB_USER', 'reportmate'),
-            'password': args.password,
-            'source': 'command-line'
-        }
+        return _credentials(args.password, 'command-line')
     
     # No password found
     print_error("No database password found!")
@@ -186,20 +186,12 @@ def cleanup_hostnames(cursor, conn, dry_run=False, auto_confirm=False):
         OR (serial_number ~ '^[A-Z\\-]+$' AND serial_number !~ '[0-9]')
     """
     
-    # Count devices
     count_query = f"SELECT COUNT(*) FROM devices {hostname_patterns}"
-    cursor.execute(count_query)
-    count = cursor.fetchone()[0]
-    
-    if count == 0:
-        print_success("No hostname-based devices found. Database is clean!")
-        return
     
-    print_info(f"Found {count} hostname-based devices")
-    
-    # List devices
+    # List devices; COUNT(*) OVER () is evaluated before LIMIT, so every row
+    # also carries the total match count (one scan instead of COUNT + SELECT)
     list_query = f"""
-    SELECT id, serial_number, name, last_seen
+    SELECT id, serial_number, name, last_seen, COUNT(*) OVER () AS total
     FROM devices {hostname_patterns}
     ORDER BY last_seen DESC
     LIMIT 50
@@ -207,11 +199,18 @@ def cleanup_hostnames(cursor, conn, dry_run=False, auto_confirm=False):
     
     cursor.execute(list_query)
     devices = cursor.fetchall()
+    count = devices[0][4] if devices else 0
+    
+    if count == 0:
+        print_success("No hostname-based devices found. Database is clean!")
+        return
+    
+    print_info(f"Found {count} hostname-based devices")
     
     print(f"\n{'Serial Number':<25} {'Name':<30} {'Last Seen'}")
     print("-" * 80)
     for device in devices:
-        id_val, serial, name, last_seen = device
+        id_val, serial, name, last_seen, _ = device
         print(f"{serial:<25} {name:<30} {str(last_seen)[:19]}")
     
     if len(devices) == 50 and count > 50:
@@ -253,18 +252,7 @@ def cleanup_win_prefix(cursor, conn, dry_run=False, auto_confirm=False):
     """Remove devices with WIN- prefix (Windows default hostname pattern)"""
     print_header("Cleanup: WIN- Prefix Devices")
     
-    # Count devices
-    count_query = "SELECT COUNT(*) FROM devices WHERE serial_number LIKE 'WIN-%'"
-    cursor.execute(count_query)
-    count = cursor.fetchone()[0]
-    
-    if count == 0:
-        print_success("No WIN- prefix devices found. Database is clean!")
-        return
-    
-    print_info(f"Found {count} WIN- prefix devices")
-    
-    # List devices
+    # List devices (unlimited, so the row count is the match count)
     list_query = """
     SELECT id, serial_number, name, last_seen
     FROM devices
@@ -274,6 +262,13 @@ def cleanup_win_prefix(cursor, conn, dry_run=False, auto_confirm=False):
     
     cursor.execute(list_query)
     devices = cursor.fetchall()
+    count = len(devices)
+    
+    if count == 0:
+        print_success("No WIN- prefix devices found. Database is clean!")
+        return
+    
+    print_info(f"Found {count} WIN- prefix devices")
     
     print(f"\n{'Serial Number':<25} {'Name':<30} {'Last Seen'}")
     print("-" * 80)
@@ -367,7 +362,7 @@ def cleanup_duplicates(cursor, conn, dry_run=False, auto_confirm=False):
     
     print_success(f"Deleted {deleted_count} duplicate records")
 
-def validate_serial_patterns(cursor):
+def validate_serial_patterns(conn):
     """
     Validate serial numbers against hostname patterns
     Shows breakdown of different hostname pattern types
@@ -375,6 +370,7 @@ def validate_serial_patterns(cursor):
     """
     print_header("Serial Number Pattern Validation")
     
+    # (description, pattern, exclude) - exclude filters out serials matching a second regex
     patterns = [
         ("Name patterns (FIRSTNAME-LASTNAME)", r"^[A-Z]+-[A-Z]+$", None),
         ("Windows hostnames (WIN-*)", r"^WIN-[A-Z0-9]+$", None),
@@ -382,36 +378,50 @@ def validate_serial_patterns(cursor):
         ("Lab/Room patterns (ANIM-STD-LAB-11)", r"^[A-Z]+-[A-Z]+-[A-Z]+-[0-9]+$", None),
         ("Username-Device patterns (JMCVEITY-0322)", r"^[A-Z]{4,}-[0-9]{4}$", None),
         ("Numbered hostnames (DESKTOP01)", r"^[A-Z]{2,}[0-9]{2,}$", None),
-        ("Only letters (no numbers)", r"^[A-Z\-]+$", r"serial_number !~ '[0-9]'"),
+        ("Only letters (no numbers)", r"^[A-Z\-]+$", r"[0-9]"),
     ]
     
     print_info("Checking serial numbers against hostname patterns...")
     print_info("(Real hardware serials should have numbers and not match these patterns)\n")
     
+    # All pattern counts come from a single scan of devices (one FILTER
+    # column per pattern) instead of one COUNT query per pattern
+    count_columns = ", ".join(
+        f"COUNT(*) FILTER (WHERE serial_number ~ :pattern{i}"
+        f" AND (CAST(:exclude{i} AS text) IS NULL OR serial_number !~ :exclude{i}))"
+        for i in range(len(patterns))
+    )
+    params = {}
+    for i, (_, pattern, exclude) in enumerate(patterns):
+        params[f"pattern{i}"] = pattern
+        params[f"exclude{i}"] = exclude
+    counts = conn.run(f"SELECT {count_columns} FROM devices", **params)[0]
+    
+    # Examples are only needed for patterns that matched; prepare the query
+    # once and re-bind the pattern for each of them
+    example_statement = conn.prepare("""
+        SELECT serial_number FROM devices
+        WHERE serial_number ~ :pattern
+          AND (CAST(:exclude AS text) IS NULL OR serial_number !~ :exclude)
+        LIMIT 5
+    """)
+    
     total_issues = 0
-    for description, pattern, additional_check in patterns:
-        if additional_check:
-            # Special case for "only letters" pattern with additional condition
-            query = f"SELECT COUNT(*) FROM devices WHERE serial_number ~ '{pattern}' AND {additional_check}"
-            example_query = f"SELECT serial_number FROM devices WHERE serial_number ~ '{pattern}' AND {additional_check} LIMIT 5"
-        else:
-            query = f"SELECT COUNT(*) FROM devices WHERE serial_number ~ '{pattern}'"
-            example_query = f"SELECT serial_number FROM devices WHERE serial_number ~ '{pattern}' LIMIT 5"
-        
-        cursor.execute(query)
-        count = cursor.fetchone()[0]
-        total_issues += count
-        
-        if count > 0:
-            print_warning(f"{description}: {count} devices")
+    try:
+        for (description, pattern, exclude), count in zip(patterns, counts):
+            total_issues += count
             
-            # Show examples
-            cursor.execute(example_query)
-            examples = cursor.fetchall()
-            for example in examples:
-                print(f"    Example: {example[0]}")
-        else:
-            print_success(f"{description}: 0 devices ✓")
+            if count > 0:
+                print_warning(f"{description}: {count} devices")
+                
+                # Show examples
+                examples = example_statement.run(pattern=pattern, exclude=exclude)
+                for example in examples:
+                    print(f"    Example: {example[0]}")
+            else:
+                print_success(f"{description}: 0 devices ✓")
+    finally:
+        example_statement.close()
     
     print()
     if total_issues == 0:
@@ -426,25 +436,11 @@ def cleanup_old_devices(cursor, conn, days=180, dry_run=False, auto_confirm=Fals
     """Remove devices not seen in X days"""
     print_header(f"Cleanup: Devices Not Seen in {days} Days")
     
-    # Count old devices
-    count_query = f"""
-    SELECT COUNT(*) FROM devices
-    WHERE last_seen < NOW() - INTERVAL '{days} days'
-    """
-    
-    cursor.execute(count_query)
-    count = cursor.fetchone()[0]
-    
-    if count == 0:
-        print_success(f"No devices older than {days} days found")
-        return
-    
-    print_info(f"Found {count} devices not seen in {days}+ days")
-    
-    # List old devices
+    # List old devices, with the total match count from COUNT(*) OVER ()
     list_query = f"""
     SELECT serial_number, name, last_seen,
-           EXTRACT(DAY FROM NOW() - last_seen) as days_ago
+           EXTRACT(DAY FROM NOW() - last_seen) as days_ago,
+           COUNT(*) OVER () as total
     FROM devices
     WHERE last_seen < NOW() - INTERVAL '{days} days'
     ORDER BY last_seen ASC
@@ -453,10 +449,17 @@ def cleanup_old_devices(cursor, conn, days=180, dry_run=False, auto_confirm=Fals
     
     cursor.execute(list_query)
     devices = cursor.fetchall()
+    count = devices[0][4] if devices else 0
+    
+    if count == 0:
+        print_success(f"No devices older than {days} days found")
+        return
+    
+    print_info(f"Found {count} devices not seen in {days}+ days")
     
     print(f"\n{'Serial Number':<25} {'Name':<30} {'Days Ago'}")
     print("-" * 80)
-    for serial, name, last_seen, days_ago in devices:
+    for serial, name, last_seen, days_ago, _ in devices:
         print(f"{serial:<25} {name:<30} {int(days_ago)}")
     
     if count > 20:
@@ -573,13 +576,25 @@ def show_stats(cursor):
     print("\n" + BOLD + "Module Record Counts:" + RESET)
     modules = ['applications', 'displays', 'hardware', 'installs', 'inventory',
                'management', 'network', 'printers', 'profiles', 'security', 'system']
-    
+
+    # Resolve which module tables exist, then count them all in one round-trip
+    # (a failed COUNT on a missing table would abort the transaction)
+    candidates = ", ".join(f"('{module}')" for module in modules)
+    cursor.execute(f"SELECT t FROM (VALUES {candidates}) AS m(t) WHERE to_regclass(t) IS NOT NULL")
+    existing = {row[0] for row in cursor.fetchall()}
+
+    counts = {}
+    if existing:
+        count_query = " UNION ALL ".join(
+            f"SELECT '{module}', COUNT(*) FROM {module}" for module in modules if module in existing
+        )
+        cursor.execute(count_query)
+        counts = dict(cursor.fetchall())
+
     for module in modules:
-        try:
-            cursor.execute(f"SELECT COUNT(*) FROM {module}")
-            count = cursor.fetchone()[0]
-            print(f"  {module}: {count}")
-        except:
+        if module in counts:
+            print(f"  {module}: {counts[module]}")
+        else:
             print(f"  {module}: N/A")
 
 def main():
@@ -687,7 +702,7 @@ Environment Variables:
         
         # Validate serial patterns
         if args.validate:
-            validate_serial_patterns(cursor)
+            validate_serial_patterns(conn)
             return
         
         # Run cleanups
@@ -60,6 +60,18 @@ variable "db_storage_mb" {
   default     = 32768
 }
 
+variable "db_pgbouncer_enabled" {
+  type        = bool
+  description = "Route application connections through the built-in PgBouncer (port 6432, TRANSACTION pooling). Requires a General Purpose or Memory Optimized SKU. Session state (SET, advisory locks, SQL-level PREPARE) does not survive between transactions; protocol-level prepared statements are supported via pgbouncer.max_prepared_statements"
+  default     = false
+}
+
+variable "db_pgbouncer_pool_size" {
+  type        = number
+  description = "PgBouncer backend connections per user/database pair (roughly 2x server vCores)"
+  default     = 4
+}
+
 variable "allowed_ips" {
   type        = list(string)
   description = "List of IP addresses allowed to access the database"
@@ -136,6 +148,18 @@ variable "function_app_sku" {
   default     = "Y1"
 }
 
+variable "function_app_max_instances" {
+  type        = number
+  description = "Maximum Flex Consumption instances for the Functions App"
+  default     = 40
+}
+
+variable "function_app_http_concurrency" {
+  type        = number
+  description = "Per-instance HTTP concurrency for the Functions App (null = platform default)"
+  default     = null
+}
+
 variable "enable_functions" {
   type        = bool
   description = "Enable Azure Functions deployment (separate from Container Apps API)"